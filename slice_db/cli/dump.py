@@ -48,6 +48,7 @@ async def dump_main(args):
         else:
             raise Exception("--no-temp-tables not supported")
         params = DumpParams(
+            binary=args.binary,
             include_schema=args.include_schema,
             parallelism=args.jobs,
             output_type=output_type,
@@ -97,6 +97,14 @@ def _add_dump_command(subparsers):
         formatter_class=ArgumentFormatter,
     )
     update_help(parser)
+    parser.add_argument(
+        "--binary",
+        "--no-binary",
+        action=NegateAction,
+        nargs=0,
+        default=False,
+        help="Whether to store untransformed data in binary COPY format, which is faster but must be restored into identical column types. Only compatible with slice output.",
+    )
     parser.add_argument(
         "--include-schema",
         "--no-include-schema",
@@ -1,4 +1,5 @@
 import logging
+import threading
 import typing
 
 import numpy
@@ -9,17 +10,65 @@ class IntSet:
         self._dtype = dtype
         self._array = numpy.array([], dtype=dtype)
 
-    def add(self, items: typing.List[int]):
+    def __len__(self):
+        return len(self._array)
+
+    def add(self, items: typing.List[int]) -> typing.List[int]:
         """
         Add and return the new items
         """
-        left = numpy.searchsorted(self._array, items, side="left")
-        right = numpy.searchsorted(self._array, items, side="right")
-        items = [item for item, i, j in zip(items, left, right) if i == j]
-        del left  # otherwise memory test fails
-        del right
-        if items:
-            self._array.resize(len(self._array) + len(items))
-            self._array[-len(items) :] = items
-            self._array.sort()
-        return items
+        return self.add_array(numpy.asarray(items, dtype=self._dtype)).tolist()
+
+    def add_array(self, items: numpy.ndarray) -> numpy.ndarray:
+        """
+        Add and return the new items, without duplicates
+        """
+        items = items[~self.contains_array(items)]
+        sorted_items, indices = numpy.unique(items, return_index=True)
+        if len(sorted_items):
+            # merge, rather than re-sort
+            positions = numpy.searchsorted(self._array, sorted_items)
+            self._array = numpy.insert(self._array, positions, sorted_items)
+        return items[numpy.sort(indices)]
+
+    def contains_array(self, items: numpy.ndarray) -> numpy.ndarray:
+        """
+        Return boolean array of whether each item is present
+        """
+        if not len(self._array):
+            return numpy.zeros(len(items), dtype=bool)
+        indices = numpy.searchsorted(self._array, items)
+        numpy.minimum(indices, len(self._array) - 1, out=indices)
+        return self._array[indices] == items
+
+
+class ShardedIntSet:
+    """
+    IntSet partitioned by item modulo shard count, so that concurrent adds
+    usually lock different shards. Thread-safe.
+    """
+
+    def __init__(self, dtype, shard_count: int):
+        self._dtype = dtype
+        self._shards = [IntSet(dtype) for _ in range(shard_count)]
+        self._locks = [threading.Lock() for _ in range(shard_count)]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def add(self, items: typing.List[int]) -> numpy.ndarray:
+        """
+        Add and return the new items, in ascending order
+        """
+        items = numpy.asarray(items, dtype=self._dtype)
+        shard_indices = items % len(self._shards)
+        new_items = []
+        for i, (shard, lock) in enumerate(zip(self._shards, self._locks)):
+            shard_items = items[shard_indices == i]
+            if not len(shard_items):
+                continue
+            with lock:
+                new_items.append(shard.add_array(shard_items))
+        if not new_items:
+            return numpy.array([], dtype=self._dtype)
+        return numpy.sort(numpy.concatenate(new_items))
@@ -1,6 +1,7 @@
 import asyncio
 import contextvars
 import functools
+import multiprocessing.pool
 import typing
 
 
@@ -12,6 +13,29 @@ async def to_thread(func, *args, **kwargs):
     return await loop.run_in_executor(None, func_call)
 
 
+async def apply_async(pool: multiprocessing.pool.Pool, func, *args):
+    """Run func in a process pool"""
+    loop = asyncio.events.get_running_loop()
+    future = loop.create_future()
+
+    def set_result(result):
+        if not future.done():
+            future.set_result(result)
+
+    def set_exception(exception):
+        if not future.done():
+            future.set_exception(exception)
+
+    # callbacks run on a thread of the pool
+    pool.apply_async(
+        func,
+        args,
+        callback=functools.partial(loop.call_soon_threadsafe, set_result),
+        error_callback=functools.partial(loop.call_soon_threadsafe, set_exception),
+    )
+    return await future
+
+
 async def wait_success(tasks: typing.Iterable[asyncio.Task]):
     tasks = list(tasks)
     if not tasks:
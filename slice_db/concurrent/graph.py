@@ -31,12 +31,15 @@ class GraphRunner(typing.Generic[T]):
         self._dep_fn = dep_fn
 
     async def run(self, items: typing.Iterable[T]):
-        check_cycle(items, self._dep_fn)
+        # call dep_fn only once per item
+        deps = {item: list(self._dep_fn(item)) for item in items}
 
-        nodes = {item: ActionNode(item) for item in items}
+        check_cycle(list(deps.keys()), deps.__getitem__)
+
+        nodes = {item: ActionNode(item) for item in deps.keys()}
 
         for item, node in nodes.items():
-            for dep in self._dep_fn(item):
+            for dep in deps[item]:
                 node.add_dep()
                 nodes[dep].reverse_dependencies.append(node)
 
@@ -49,4 +52,8 @@ class GraphRunner(typing.Generic[T]):
         await self._process_nodes(item.reverse_dependencies)
 
     async def _process_nodes(self, items: typing.Iterable[ActionNode]):
-        await wait_success(self._run_node(item) for item in items if item.can_execute())
+        await wait_success(
+            asyncio.create_task(self._run_node(item))
+            for item in items
+            if item.can_execute()
+        )
@@ -6,6 +6,9 @@ import contextlib
 import dataclasses
 import enum
 import logging
+import multiprocessing
+import multiprocessing.pool
+import os
 import tempfile
 import time
 import typing
@@ -14,7 +17,7 @@ import asyncpg
 import numpy
 from pg_sql import SqlId, SqlObject, sql_list
 
-from .collection.set import IntSet
+from .collection.set import ShardedIntSet
 from .concurrent import to_thread, wait_success
 from .concurrent.lock import LifoSemaphore
 from .concurrent.queue import Queue
@@ -40,7 +43,7 @@ from .pg.token import parse_statements
 from .resource import AsyncResourceFactory, ResourceFactory
 from .slice import SliceWriter
 from .sql import SqlWriter
-from .transform import TableTransformer, Transforms
+from .transform import TableTransformer, Transforms, init_transform_process
 
 
 class OutputType(enum.Enum):
@@ -65,6 +68,7 @@ class DumpStrategy(typing.Protocol):
 
 @dataclasses.dataclass
 class DumpParams:
+    binary: bool
     include_schema: bool
     parallelism: int
     pepper: bytes
@@ -112,14 +116,41 @@ async def dump(
                     await _pg_dump_section("pre-data", f)
             output = _SqlOutput(sql_writer)
 
-        result = _DiscoveryResult()
+        if params.binary:
+            if params.output_type != OutputType.SLICE:
+                raise Exception("Binary format requires slice output")
+            # transforms operate on text
+            binary_table_ids = {
+                table.id for table in schema.tables() if table.id not in transformers
+            }
+        else:
+            binary_table_ids = set()
+
+        result = _DiscoveryResult(
+            binary_table_ids=binary_table_ids, shard_count=params.parallelism
+        )
+
+        if transformers and hasattr(os, "fork"):
+            # transforms are CPU-bound, so run them in worker processes, which
+            # are forked with the transformers already created; unlike
+            # ProcessPoolExecutor, Pool forks every worker here, before
+            # connections are opened and tasks are running
+            transform_pool = stack.enter_context(
+                multiprocessing.get_context("fork").Pool(
+                    processes=params.parallelism,
+                    initializer=init_transform_process,
+                    initargs=(transformers,),
+                )
+            )
+        else:
+            transform_pool = None
 
         isolation = "repeatable_read" if params.parallelism == 1 else None
         async with io.conn() as conn, conn.transaction(
             isolation=isolation,
             # https://github.com/MagicStack/asyncpg/issues/743
             # readonly=True
-        ):
+        ), contextlib.AsyncExitStack() as conn_stack:
             await conn.execute("SET statement_timeout TO 0")
             row_counts = await _set_row_counts(conn, list(schema.tables()))
 
@@ -134,15 +165,32 @@ async def dump(
                 snapshot = await export_snapshot(conn)
                 logging.info("Running at snapshot %s", snapshot)
 
+                # connections stay in their snapshot transaction until the end
+                # of the dump, and are reused by later tasks
+                idle_conns = []
+
                 @contextlib.asynccontextmanager
                 async def conn_factory():
-                    async with io.conn() as conn, conn.transaction(
-                        isolation="repeatable_read",
-                        # https://github.com/MagicStack/asyncpg/issues/743
-                        # readonly=True
-                    ):
+                    if idle_conns:
+                        conn = idle_conns.pop()
+                    else:
+                        conn = await conn_stack.enter_async_context(io.conn())
+                        await conn_stack.enter_async_context(
+                            conn.transaction(
+                                isolation="repeatable_read",
+                                # https://github.com/MagicStack/asyncpg/issues/743
+                                # readonly=True
+                            )
+                        )
                         await set_snapshot(conn, snapshot)
-                        yield conn
+                        await conn.execute("SET statement_timeout TO 0")
+                        # idle between tasks
+                        await conn.execute(
+                            "SET idle_in_transaction_session_timeout TO 0"
+                        )
+                    yield conn
+                    # on failure, the connection is rolled back with the stack
+                    idle_conns.append(conn)
 
             await _dump_rows(
                 conn_factory=conn_factory,
@@ -153,6 +201,7 @@ async def dump(
                 result=result,
                 roots=roots,
                 strategy=params.strategy,
+                transform_pool=transform_pool,
                 transformers=transformers,
             )
 
@@ -182,6 +231,7 @@ async def _dump_rows(
     result,
     roots: typing.List[Root],
     strategy: DumpStrategy,
+    transform_pool: typing.Optional[multiprocessing.pool.Pool],
     transformers: typing.Dict[str, TableTransformer],
 ):
     """
@@ -200,7 +250,9 @@ async def _dump_rows(
         conn_factory=conn_factory,
         lock=lock,
         output=output,
+        parallelism=parallelism,
         result=result,
+        transform_pool=transform_pool,
         transformers=transformers,
         queue=queue,
     )
@@ -242,15 +294,15 @@ async def _dump_sequences(
         logging.log(TRACE, "Dumping %s sequences", len(sequence_ids))
         start = time.perf_counter()
 
-        for sequence_id in sequence_ids:
-            sequence = schema.get_sequence(sequence_id)
+        # read all sequences in a single roundtrip
+        sequences = [schema.get_sequence(id) for id in sequence_ids]
+        query = " UNION ALL ".join(
+            f"SELECT {i} AS i, last_value FROM {sequence.sql}"
+            for i, sequence in enumerate(sequences)
+        )
+        for row in await conn.fetch(query):
+            sequence = sequences[row["i"]]
             result.add_sequence(sequence)
-            row = await conn.fetchrow(
-                f"""
-                SELECT last_value
-                FROM {sequence.sql}
-                """,
-            )
             output.write_sequence(sequence, row["last_value"])
 
         end = time.perf_counter()
@@ -271,6 +323,9 @@ class _Output(typing.Protocol):
 class _SliceOutput(_Output):
     """
     Concurrency-safe slice output
+
+    A zip file accepts only one open member at a time, so writes are
+    serialized. Callers should prepare data before opening a segment.
     """
 
     def __init__(self, writer: SliceWriter):
@@ -302,6 +357,8 @@ class _SliceOutput(_Output):
 class _SqlOutput(_Output):
     """
     Concurrency-safe SQL output
+
+    All segments go to the same stream, so writes are serialized.
     """
 
     def __init__(self, writer: SqlWriter):
@@ -351,36 +408,44 @@ async def _pg_dump_section(section: str, out: typing.BinaryIO) -> str:
 class _DiscoveryResult:
     """
     Discovered IDs
+
+    IDs are added on worker threads. Each table's IDs are sharded, so that
+    concurrent discovery rarely contends, even within the same table.
     """
 
-    _row_ids: typing.DefaultDict[str, IntSet]
+    _row_ids: typing.DefaultDict[str, ShardedIntSet]
     _sequence_manifests: typing.Dict[str, ManifestSequence]
     _table_manifests: typing.Dict[str, ManifestTable]
     section_counts: typing.DefaultDict[str, int]
 
-    def __init__(self):
-        self._id_count = 0
-        self._row_ids = collections.defaultdict(lambda: IntSet(numpy.int64))
+    def __init__(self, binary_table_ids: typing.Set[str], shard_count: int):
+        self._binary_table_ids = binary_table_ids
+        self._row_ids = collections.defaultdict(
+            lambda: ShardedIntSet(numpy.int64, shard_count)
+        )
         self._sequence_manifests = {}
         self._table_manifests = {}
         self.section_counts = collections.defaultdict(lambda: 0)
 
-    def add(
-        self, table: Table, row_ids: typing.List[int]
-    ) -> typing.Optional[TableSegment]:
+    async def add(
+        self, table: Table, row_ids: typing.List[int], max_size: int
+    ) -> typing.List[TableSegment]:
         """
-        Add IDs and return list of newly added segment
+        Add IDs and return list of newly added segments, of at most max_size
         """
         existing_ids = self._row_ids[table.id]
-        new_ids = existing_ids.add(row_ids)
-        if not new_ids:
-            return
+        new_ids = await to_thread(existing_ids.add, row_ids)
 
-        self._id_count += len(new_ids)
+        return [
+            self._add_segment(table, new_ids[i : i + max_size])
+            for i in range(0, len(new_ids), max_size)
+        ]
 
+    def _add_segment(self, table: Table, row_ids: typing.List[int]) -> TableSegment:
         if table.id not in self._table_manifests:
             self._table_manifests[table.id] = ManifestTable(
                 columns=table.columns,
+                format=self.copy_format(table.id),
                 name=table.name,
                 schema=table.schema,
                 segments=[],
@@ -389,13 +454,19 @@ class _DiscoveryResult:
 
         segment = TableSegment(
             table=table,
-            row_ids=new_ids,
+            row_ids=row_ids,
             index=len(table_manifest.segments),
         )
-        table_manifest.segments.append(ManifestTableSegment(row_count=len(new_ids)))
+        table_manifest.segments.append(ManifestTableSegment(row_count=len(row_ids)))
 
         return segment
 
+    def copy_format(self, table_id: str) -> str:
+        """
+        COPY format of table data
+        """
+        return "binary" if table_id in self._binary_table_ids else "text"
+
     def add_sequence(self, sequence: Sequence):
         self._sequence_manifests[sequence.id] = ManifestSequence(
             name=sequence.name, schema=sequence.schema
@@ -406,7 +477,7 @@ class _DiscoveryResult:
         """
         Total rows
         """
-        return self._id_count
+        return sum(len(row_ids) for row_ids in self._row_ids.values())
 
     def sequence_manifests(self):
         """
@@ -426,9 +497,13 @@ class Dump:
     conn_factory: AsyncResourceFactory[asyncpg.Connection]
     lock: typing.AsyncContextManager
     output: _SliceOutput
+    parallelism: int
     result: _DiscoveryResult
+    transform_pool: typing.Optional[multiprocessing.pool.Pool]
     transformers: typing.Dict[str, TableTransformer]
     queue: Queue
+    # query text built by the strategy, kept for the life of the dump
+    queries: typing.Dict[typing.Tuple, str] = dataclasses.field(default_factory=dict)
 
     async def _wrap(self, fn: typing.Callable):
         async with self.lock:
@@ -3,18 +3,18 @@ from __future__ import annotations
 import asyncio
 import dataclasses
 import functools
+import json
 import logging
-import os
 import shutil
-import sys
 import tempfile
 import time
 import typing
 
 import asyncpg
+import numpy
 from pg_sql import SqlId, SqlObject, sql_list
 
-from .concurrent import to_thread
+from .concurrent import apply_async, to_thread
 from .dump import (
     Dump,
     DumpReferenceDirection,
@@ -25,10 +25,13 @@ from .dump import (
     TableSegment,
 )
 from .log import TRACE
-from .transform import TableTransformer
+from .pg.copy import TidBinaryCopyParser
+from .transform import TableTransformer, transform_file
 
 MAX_SIZE = 1000 * 50
 
+SPOOL_SIZE = 1024 * 1024 * 8
+
 
 class TempTableStrategy(DumpStrategy):
     @property
@@ -41,16 +44,46 @@ class TempTableStrategy(DumpStrategy):
             dump.start_task(task())
 
 
+BlockRange = typing.Tuple[int, typing.Optional[int]]
+
+
 @dataclasses.dataclass
 class _RootTask:
     table: Table
     condition: str
     dump: Dump
+    block_range: typing.Optional[BlockRange] = None
 
     async def __call__(self):
         async with self.dump.conn_factory() as conn:
+            if (
+                self.block_range is None
+                and 1 < self.dump.parallelism
+                and MAX_SIZE < self.table.row_count
+            ):
+                block_ranges = await _block_ranges(
+                    conn, self.table, self.condition, self.dump.parallelism
+                )
+                if 1 < len(block_ranges):
+                    for block_range in block_ranges:
+                        task = _RootTask(
+                            table=self.table,
+                            condition=self.condition,
+                            dump=self.dump,
+                            block_range=block_range,
+                        )
+                        self.dump.start_task(task())
+                    return
+
+            condition = self.condition
+            if self.block_range is not None:
+                start, end = self.block_range
+                condition = f"({condition}) AND '({start},0)'::tid <= ctid"
+                if end is not None:
+                    condition += f" AND ctid < '({end},0)'::tid"
+
             segments = await _discover_table_condition(
-                conn, self.table, self.condition, self.dump.result
+                conn, self.table, condition, self.dump.result
             )
 
             for segment in segments:
@@ -86,12 +119,16 @@ class _TableTask:
             ):
                 return
 
+        # not deduplicated by reference and direction: every segment has
+        # different rows, and so may find different rows; rows themselves are
+        # deduplicated by the discovery result
         segments = await _discover_reference(
             conn,
             self.segment,
             reference,
             direction,
             self.dump.result,
+            self.dump.queries,
         )
 
         for segment in segments:
@@ -104,7 +141,18 @@ class _TableTask:
             self.dump.start_task(task())
 
     async def __call__(self):
-        with tempfile.TemporaryFile() as tmp:
+        try:
+            transformer = self.dump.transformers[self.segment.table.id]
+        except KeyError:
+            transformer = None
+        if transformer is not None and self.dump.transform_pool is not None:
+            # worker processes open the file by name
+            tmp_factory = tempfile.NamedTemporaryFile
+        else:
+            # small segments stay in memory, rather than round-tripping through disk
+            tmp_factory = functools.partial(tempfile.SpooledTemporaryFile, SPOOL_SIZE)
+
+        with tmp_factory() as tmp:
             async with self.dump.conn_factory() as conn:
                 await _prepare_discover_reference(conn, self.segment)
 
@@ -122,70 +170,158 @@ class _TableTask:
                     await self._process_reference(
                         conn, reference, DumpReferenceDirection.REVERSE
                     )
-                await conn.execute("SET statement_timeout TO 0")
-                await _dump_data(conn, self.segment.table, self.segment.row_ids, tmp)
+                await _dump_data(
+                    conn,
+                    self.segment.table,
+                    self.segment.row_ids,
+                    tmp,
+                    self.dump.result.copy_format(self.segment.table.id),
+                    self.dump.queries,
+                )
 
             tmp.seek(0)
-            try:
-                transformer = self.dump.transformers[self.segment.table.id]
-            except KeyError:
+            if transformer is None:
                 # copy file without tranformation
                 async with self.dump.output.open_segment(self.segment) as f:
                     await to_thread(shutil.copyfileobj, tmp, f)
+            elif self.dump.transform_pool is not None:
+                # in a worker process, transform to new temp file, and then copy
+                # that transformed temp file
+                tmp.flush()
+                with tempfile.NamedTemporaryFile() as tmp_transformed:
+                    await apply_async(
+                        self.dump.transform_pool,
+                        transform_file,
+                        self.segment.table.id,
+                        tmp.name,
+                        tmp_transformed.name,
+                    )
+                    async with self.dump.output.open_segment(self.segment) as f:
+                        await to_thread(shutil.copyfileobj, tmp_transformed, f)
             else:
-                if hasattr(os, "fork"):
-                    # in a forked process, transform to new temp file, and then copy
-                    # that transformed temp file
-                    with tempfile.TemporaryFile() as tmp_transformed:
-                        os.set_inheritable(tmp.fileno(), True)
-                        os.set_inheritable(tmp_transformed.fileno(), True)
-                        pid = os.fork()
-                        if not pid:
-                            try:
-                                TableTransformer.transform_binary(
-                                    transformer, tmp, tmp_transformed
-                                )
-                                tmp_transformed.flush()
-                            except BaseException as e:
-                                print(str(e), file=sys.stderr)
-                                os._exit(1)
-                            os._exit(0)
-                        _, exit_code = await to_thread(os.waitpid, pid, 0)
-                        if exit_code:
-                            raise Exception("Transform failed")
-                        tmp_transformed.seek(0)
-                        async with self.dump.output.open_segment(self.segment) as f:
-                            await to_thread(shutil.copyfileobj, tmp_transformed, f)
-                else:
-                    # copy file with transformation
+                # transform to new temp file, and then copy that transformed
+                # temp file, so the output is not locked during the transform
+                with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as tmp_transformed:
+                    await to_thread(
+                        TableTransformer.transform_binary,
+                        transformer,
+                        tmp,
+                        tmp_transformed,
+                    )
+                    tmp_transformed.seek(0)
                     async with self.dump.output.open_segment(self.segment) as f:
-                        await to_thread(
-                            TableTransformer.transform_binary,
-                            transformer,
-                            tmp,
-                            f,
-                        )
+                        await to_thread(shutil.copyfileobj, tmp_transformed, f)
+
+
+def _dump_data_query(queries: typing.Dict[typing.Tuple, str], table: Table) -> str:
+    key = ("data", table.id)
+    if key not in queries:
+        query = f"""
+            SELECT {sql_list(table.columns_sql)}
+            FROM {table.sql}
+            WHERE ctid = ANY(ARRAY(SELECT tid FROM pg_temp._slice_db))
+        """
+        queries[key] = query
+    return queries[key]
 
 
-async def _dump_data(conn: asyncpg.Connection, table: Table, ids, out: typing.BinaryIO):
+async def _dump_data(
+    conn: asyncpg.Connection,
+    table: Table,
+    ids,
+    out: typing.BinaryIO,
+    format: str,
+    queries: typing.Dict[typing.Tuple, str],
+):
     """
     Dump data
     """
 
     logging.log(TRACE, f"Dumping %s rows from table %s", len(ids), table.id)
     start = time.perf_counter()
-    query = f"""
-        SELECT {sql_list(table.columns_sql)}
-        FROM {table.sql}
-        WHERE ctid = ANY(ARRAY(SELECT tid FROM pg_temp._slice_db))
-    """
-    await conn.copy_from_query(query, output=functools.partial(to_thread, out.write))
+    query = _dump_data_query(queries, table)
+    await conn.copy_from_query(
+        query, output=functools.partial(to_thread, out.write), format=format
+    )
     end = time.perf_counter()
     logging.debug(
         f"Dumped %s rows from table %s (%.3fs)", len(ids), table.id, end - start
     )
 
 
+async def _add_query_ids(
+    conn: asyncpg.Connection, query: str, table: Table, result: _DiscoveryResult
+) -> typing.Tuple[int, typing.List[TableSegment]]:
+    """
+    Add IDs found by query, returning the found count and new segments. IDs
+    are streamed via binary COPY and added in chunks.
+    """
+    parser = TidBinaryCopyParser()
+    pending_ids = []
+    pending_count = 0
+    found_count = 0
+    new_segments = []
+
+    async def add():
+        nonlocal pending_ids, pending_count
+        ids = numpy.concatenate(pending_ids)
+        pending_ids = []
+        pending_count = 0
+        new_segments.extend(await result.add(table, ids, MAX_SIZE))
+
+    async def output(data: bytes):
+        nonlocal pending_count, found_count
+        ids = parser.parse(data)
+        pending_ids.append(ids)
+        pending_count += len(ids)
+        found_count += len(ids)
+        if MAX_SIZE <= pending_count:
+            await add()
+
+    await conn.copy_from_query(query, output=output, format="binary")
+    parser.finish()
+    if pending_count:
+        await add()
+
+    return found_count, new_segments
+
+
+async def _block_ranges(
+    conn: asyncpg.Connection, table: Table, condition: str, count: int
+) -> typing.List[BlockRange]:
+    """
+    Split table into at most count ranges of blocks, if condition is expected to
+    find more than MAX_SIZE rows. The last range is open-ended.
+    """
+    # TID range scans were added in PostgreSQL 14; before that, each range
+    # would scan the entire table
+    if conn.get_server_version() < (14,):
+        return [(0, None)]
+
+    # a selective condition finds few rows however large the table is, and
+    # each range becomes at least one segment to process
+    plan = await conn.fetchval(
+        f"EXPLAIN (FORMAT JSON) SELECT ctid FROM {table.sql} WHERE {condition}"
+    )
+    if json.loads(plan)[0]["Plan"]["Plan Rows"] <= MAX_SIZE:
+        return [(0, None)]
+
+    block_count = await conn.fetchval(
+        "SELECT pg_relation_size($1::regclass) / current_setting('block_size')::int",
+        str(table.sql),
+    )
+    return _split_blocks(block_count, count)
+
+
+def _split_blocks(block_count: int, count: int) -> typing.List[BlockRange]:
+    """
+    Split block_count blocks into at most count ranges of equal size, rounded up
+    """
+    size = max(1, -(-block_count // count))
+    starts = list(range(0, block_count, size)) or [0]
+    return [(start, end) for start, end in zip(starts, starts[1:] + [None])]
+
+
 async def _discover_table_condition(
     conn: asyncpg.Connection, table: Table, condition: str, result: _DiscoveryResult
 ) -> typing.List[Tid]:
@@ -195,21 +331,13 @@ async def _discover_table_condition(
     logging.log(TRACE, f"Finding rows from table %s", table.id)
     start = time.perf_counter()
 
-    await conn.execute("SET statement_timeout TO 0")
     query = f"""
         SELECT ctid
         FROM {table.sql}
         WHERE {condition}
         ORDER BY 1
     """
-    found_ids = [id_ for id_, in await conn.fetch(query)]
-
-    new_segments = []
-    for i in range(0, len(found_ids), MAX_SIZE):
-        await asyncio.sleep(0)
-        new_segment = result.add(table, found_ids[i : i + MAX_SIZE])
-        if new_segment is not None:
-            new_segments.append(new_segment)
+    found_count, new_segments = await _add_query_ids(conn, query, table, result)
 
     end = time.perf_counter()
     if not new_segments:
@@ -221,7 +349,7 @@ async def _discover_table_condition(
     else:
         logging.debug(
             f"Found %s rows (%s new) as %s/%s (%.3fs)",
-            len(found_ids),
+            found_count,
             sum(len(segment.row_ids) for segment in new_segments),
             table.id,
             ",".join(str(segment.index) for segment in new_segments),
@@ -239,36 +367,72 @@ async def _prepare_discover_reference(conn: asyncpg.Connection, segment: TableSe
                 IF to_regclass('pg_temp._slice_db') IS NULL THEN
                     CREATE TEMP TABLE _slice_db (tid tid)
                     ON COMMIT DELETE ROWS;
+                ELSE
+                    TRUNCATE pg_temp._slice_db;
                 END IF;
             END;
         $$
         """
     )
     await conn.copy_records_to_table(
-        "_slice_db", records=((i,) for i in segment.row_ids), schema_name="pg_temp"
+        "_slice_db",
+        records=((i,) for i in segment.row_ids.tolist()),
+        schema_name="pg_temp",
     )
     await conn.execute("ANALYZE pg_temp._slice_db")
 
 
+def _discover_reference_query(
+    queries: typing.Dict[typing.Tuple, str],
+    reference: Reference,
+    direction: DumpReferenceDirection,
+) -> str:
+    key = ("reference", reference.id, direction)
+    if key not in queries:
+        queries[key] = _build_discover_reference_query(reference, direction)
+    return queries[key]
+
+
+def _build_discover_reference_query(
+    reference: Reference, direction: DumpReferenceDirection
+) -> str:
+    if direction == DumpReferenceDirection.FORWARD:
+        from_columns = reference.columns
+        from_table = reference.table
+        to_columns = reference.reference_columns
+        to_table = reference.reference_table
+    elif direction == DumpReferenceDirection.REVERSE:
+        from_columns = reference.reference_columns
+        from_table = reference.reference_table
+        to_columns = reference.columns
+        to_table = reference.table
+
+    from_expr = sql_list([SqlObject(SqlId("a"), SqlId(name)) for name in from_columns])
+    to_expr = sql_list([SqlObject(SqlId("b"), SqlId(name)) for name in to_columns])
+    # no DISTINCT or ORDER BY: the discovery result deduplicates and sorts, which
+    # is cheaper than a sort on the server and lets rows stream immediately
+    return f"""
+        SELECT b.ctid
+        FROM {from_table.sql} AS a
+            JOIN {to_table.sql} AS b ON ({from_expr}) = ({to_expr})
+            JOIN pg_temp._slice_db AS sd ON a.ctid = sd.tid
+    """
+
+
 async def _discover_reference(
     conn: asyncpg.Connection,
     segment: TableSegment,
     reference: Reference,
     direction: DumpReferenceDirection,
     result,
+    queries: typing.Dict[typing.Tuple, str],
 ) -> typing.List[Tid]:
     """
     Discover, using reference
     """
     if direction == DumpReferenceDirection.FORWARD:
-        from_columns = reference.columns
-        from_table = reference.table
-        to_columns = reference.reference_columns
         to_table = reference.reference_table
     elif direction == DumpReferenceDirection.REVERSE:
-        from_columns = reference.reference_columns
-        from_table = reference.reference_table
-        to_columns = reference.columns
         to_table = reference.table
 
     logging.log(
@@ -281,33 +445,14 @@ async def _discover_reference(
     )
     start = time.perf_counter()
 
-    from_expr = sql_list([SqlObject(SqlId("a"), SqlId(name)) for name in from_columns])
-    to_expr = sql_list([SqlObject(SqlId("b"), SqlId(name)) for name in to_columns])
-    # assumption: add reference has a unique value on the reference table
-    # therefore, no need to dedup child records since they will be had by only one parent
-    distinct = "DISTINCT" if direction == DumpReferenceDirection.FORWARD else ""
-    query = f"""
-        SELECT {distinct} b.ctid
-        FROM {from_table.sql} AS a
-            JOIN {to_table.sql} AS b ON ({from_expr}) = ({to_expr})
-            JOIN pg_temp._slice_db AS sd ON a.ctid = sd.tid
-        ORDER BY 1
-    """
-    found_ids = [id_ for id_, in await conn.fetch(query)]
-
-    await conn.execute("SET statement_timeout TO 0")
-    new_segments = []
-    for i in range(0, len(found_ids), MAX_SIZE):
-        await asyncio.sleep(0)
-        new_segment = result.add(to_table, found_ids[i : i + MAX_SIZE])
-        if new_segment is not None:
-            new_segments.append(new_segment)
+    query = _discover_reference_query(queries, reference, direction)
+    found_count, new_segments = await _add_query_ids(conn, query, to_table, result)
 
     end = time.perf_counter()
     if not new_segments:
         logging.debug(
             f"Found %s rows (no new) in table %s using %s/%s via %s (%.3fs)",
-            len(found_ids),
+            found_count,
             to_table.id,
             segment.table.id,
             segment.index,
@@ -317,7 +462,7 @@ async def _discover_reference(
     else:
         logging.debug(
             f"Found %s rows (%s new) as %s/%s using %s/%s via %s (%.3fs)",
-            len(found_ids),
+            found_count,
             sum(len(segment.row_ids) for segment in new_segments),
             to_table.id,
             ",".join(str(segment.index) for segment in new_segments),
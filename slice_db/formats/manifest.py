@@ -44,6 +44,8 @@ class ManifestTable:
     """Schema"""
     segments: typing.List[ManifestTableSegment]
     """Segments"""
+    format: str = "text"
+    """COPY format of segments"""
 
 
 @dataclasses_json.dataclass_json(letter_case=dataclasses_json.LetterCase.CAMEL)
@@ -1,5 +1,7 @@
 import typing
 
+import numpy
+
 Field = typing.Optional[str]
 RawRow = typing.List[str]
 
@@ -61,3 +63,93 @@ class CopyFormat:
 
 
 COPY_FORMAT = CopyFormat()
+
+
+_BINARY_SIGNATURE = b"PGCOPY\n\xff\r\n\0"
+
+_BINARY_HEADER_SIZE = len(_BINARY_SIGNATURE) + 8
+
+BINARY_HEADER = _BINARY_SIGNATURE + bytes(8)
+"""Binary COPY header, without flags or extension"""
+
+BINARY_TRAILER = b"\xff\xff"
+"""Binary COPY trailer"""
+
+_BINARY_TID_ROW = numpy.dtype(
+    [("field_count", ">i2"), ("length", ">i4"), ("block", ">u4"), ("offset", ">u2")]
+)
+
+
+class BinaryCopyBodyParser:
+    """
+    Strip the header and trailer from binary COPY data, leaving the rows. Data
+    may be split at any point.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._header_read = False
+
+    def parse(self, data: bytes) -> bytes:
+        """
+        Parse data and return the row data available so far
+        """
+        buffer = self._buffer + data
+        if not self._header_read:
+            if len(buffer) < _BINARY_HEADER_SIZE:
+                self._buffer = buffer
+                return b""
+            if not buffer.startswith(_BINARY_SIGNATURE):
+                raise Exception("Invalid binary COPY signature")
+            extension_size = int.from_bytes(
+                buffer[_BINARY_HEADER_SIZE - 4 : _BINARY_HEADER_SIZE], "big"
+            )
+            start = _BINARY_HEADER_SIZE + extension_size
+            if len(buffer) < start:
+                self._buffer = buffer
+                return b""
+            buffer = buffer[start:]
+            self._header_read = True
+
+        # hold back what may be the trailer
+        end = max(0, len(buffer) - len(BINARY_TRAILER))
+        self._buffer = buffer[end:]
+        return buffer[:end]
+
+    def finish(self):
+        """
+        Check that all data was parsed
+        """
+        if self._buffer != BINARY_TRAILER:
+            raise Exception("Invalid binary COPY trailer")
+
+
+class TidBinaryCopyParser:
+    """
+    Parse binary COPY output of a single, non-null tid column, into ints of
+    block << 16 | offset. Data may be split at any point.
+    """
+
+    def __init__(self):
+        self._body_parser = BinaryCopyBodyParser()
+        self._buffer = b""
+
+    def parse(self, data: bytes) -> numpy.ndarray:
+        """
+        Parse data and return the complete rows
+        """
+        buffer = self._buffer + self._body_parser.parse(data)
+        count = len(buffer) // _BINARY_TID_ROW.itemsize
+        rows = numpy.frombuffer(buffer, _BINARY_TID_ROW, count)
+        self._buffer = buffer[count * _BINARY_TID_ROW.itemsize :]
+        if not ((rows["field_count"] == 1) & (rows["length"] == 6)).all():
+            raise Exception("Invalid binary COPY tid row")
+        return (rows["block"].astype(numpy.int64) << 16) | rows["offset"]
+
+    def finish(self):
+        """
+        Check that all data was parsed
+        """
+        self._body_parser.finish()
+        if self._buffer:
+            raise Exception("Incomplete binary COPY tid row")
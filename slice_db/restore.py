@@ -19,10 +19,10 @@ from .formats.manifest import (
     MANIFEST_DATA_JSON_FORMAT,
     Manifest,
     ManifestTable,
-    ManifestTableSegment,
 )
 from .log import TRACE
 from .pg import defer_constraints
+from .pg.copy import BINARY_HEADER, BINARY_TRAILER, BinaryCopyBodyParser
 from .resource import AsyncResourceFactory, ResourceFactory
 from .slice import SliceReader
 
@@ -102,17 +102,23 @@ async def _restore_sequences(
     manifest: Manifest,
     reader: SliceReader,
 ):
+    statements = []
+    for id, sequence in manifest.sequences.items():
+        value = SqlNumber(reader.read_sequence(id))
+        seq = SqlObject(SqlId(sequence.schema), SqlId(sequence.name))
+        statements.append(
+            f"""
+            SELECT setval({SqlString(str(seq))}, {SqlNumber(value)})
+            FROM {seq}
+            WHERE last_value < {value}
+            """
+        )
+    if not statements:
+        return
+
     async with conn_factory() as conn:
-        for id, sequence in manifest.sequences.items():
-            value = SqlNumber(reader.read_sequence(id))
-            seq = SqlObject(SqlId(sequence.schema), SqlId(sequence.name))
-            await conn.execute(
-                f"""
-                SELECT setval({SqlString(str(seq))}, {SqlNumber(value)})
-                FROM {seq}
-                WHERE last_value < {value}
-                """
-            )
+        # without arguments, execute sends all statements in a single roundtrip
+        await conn.execute(";".join(statements))
 
 
 async def _restore_rows(
@@ -173,12 +179,7 @@ class RestoreItem:
         await asyncio.gather(*self.deps)
 
         async with self.conn_factory() as conn:
-            for i, segment in enumerate(self.table.segments):
-                with self.reader.open_segment(
-                    self.id,
-                    i,
-                ) as file:
-                    await update_data(conn, self.id, self.table, i, segment, file)
+            await update_data(conn, self.id, self.table, self.reader)
 
     def __hash__(self):
         return id(self)
@@ -188,30 +189,46 @@ async def update_data(
     conn: asyncpg.Connection,
     id: str,
     table: ManifestTable,
-    index: int,
-    segment: ManifestTableSegment,
-    in_: typing.BinaryIO,
+    reader: SliceReader,
 ):
-    logging.log(TRACE, f"Restoring %s rows into table %s", segment.row_count, id)
+    row_count = sum(segment.row_count for segment in table.segments)
+    logging.log(TRACE, f"Restoring %s rows into table %s", row_count, id)
     start = time.perf_counter()
 
+    binary = table.format == "binary"
+
     async def source():
-        while True:
-            bytes = await to_thread(in_.read, 1024 * 32)
-            if not bytes:
-                break
-            yield bytes
+        # all segments in a single COPY; binary segments each have a header and
+        # trailer, so those are replaced by a single header and trailer
+        if binary:
+            yield BINARY_HEADER
+        for i in range(len(table.segments)):
+            with reader.open_segment(id, i) as in_:
+                body_parser = BinaryCopyBodyParser() if binary else None
+                while True:
+                    bytes = await to_thread(in_.read, 1024 * 32)
+                    if not bytes:
+                        break
+                    if body_parser is not None:
+                        bytes = body_parser.parse(bytes)
+                    if bytes:
+                        yield bytes
+                if body_parser is not None:
+                    body_parser.finish()
+        if binary:
+            yield BINARY_TRAILER
 
     await conn.copy_to_table(
         table.name,
         source=source(),
         schema_name=table.schema,
         columns=table.columns,
+        format=table.format,
     )
     end = time.perf_counter()
     logging.debug(
         f"Restored %s rows in table %s (%.3fs)",
-        segment.row_count,
+        row_count,
         id,
         end - start,
     )
@@ -219,6 +236,9 @@ async def update_data(
 
 @dataclasses.dataclass
 class ForeignKey:
+    # dataclass(slots=True) requires Python 3.10
+    __slots__ = ("deferrable", "name", "schema", "table", "reference_table")
+
     deferrable: bool
     """Deferrable"""
     name: str
@@ -267,16 +287,7 @@ async def get_constaints(
         [table.name for table in manifest_tables.values()],
     )
 
-    foreign_keys = []
-    for schema, name, table, reference_table, deferrable in rows:
-        foreign_keys.append(
-            ForeignKey(
-                deferrable=deferrable,
-                name=name,
-                reference_table=reference_table,
-                schema=schema,
-                table=table,
-            )
-        )
-
-    return foreign_keys
+    return [
+        ForeignKey(deferrable, name, schema, table, reference_table)
+        for schema, name, table, reference_table, deferrable in rows
+    ]
@@ -6,6 +6,9 @@ import codecs
 import typing
 import zipfile
 
+_COMPRESS_LEVEL = 1
+"""Deflate level. Writes are serialized, so favor speed over ratio."""
+
 _MANIFEST_PATH = "manifest.json"
 
 
@@ -72,7 +75,12 @@ class SliceWriter:
     """
 
     def __init__(self, file: typing.BinaryIO):
-        self._zip = zipfile.ZipFile(file, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip = zipfile.ZipFile(
+            file,
+            "w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=_COMPRESS_LEVEL,
+        )
 
     def __enter__(self, *args, **kwargs):
         self._zip.__enter__(*args, **kwargs)
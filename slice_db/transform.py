@@ -123,3 +123,23 @@ class TableTransformer:
         output: typing.BinaryIO,
     ):
         transformer.transform(_UTF8_READ(input), _UTF8_WRITE(output))
+
+
+_process_transformers: typing.Dict[str, TableTransformer] = {}
+
+
+def init_transform_process(transformers: typing.Dict[str, TableTransformer]):
+    """
+    Initialize worker process for transform_file
+    """
+    _process_transformers.update(transformers)
+
+
+def transform_file(table_id: str, input_path: str, output_path: str):
+    """
+    Transform file, in a worker process
+    """
+    with open(input_path, "rb") as input, open(output_path, "wb") as output:
+        TableTransformer.transform_binary(
+            _process_transformers[table_id], input, output
+        )
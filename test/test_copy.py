@@ -1,3 +1,5 @@
+import numpy
+
 import slice_db.pg.copy
 
 
@@ -11,3 +13,33 @@ def test_serialize():
     assert slice_db.pg.copy.COPY_FORMAT.serialize_field("a") == "a"
     assert slice_db.pg.copy.COPY_FORMAT.serialize_field(None) == r"\N"
     assert slice_db.pg.copy.COPY_FORMAT.serialize_field("a\nb") == r"a\nb"
+
+
+_TID_BINARY_COPY = (
+    b"PGCOPY\n\xff\r\n\0"
+    + b"\0\0\0\0\0\0\0\0"
+    + b"\0\1\0\0\0\6\0\0\0\0\0\1"
+    + b"\0\1\0\0\0\6\0\0\1\0\0\2"
+    + b"\xff\xff"
+)
+
+
+def test_tid_binary():
+    for i in range(len(_TID_BINARY_COPY)):
+        parser = slice_db.pg.copy.TidBinaryCopyParser()
+        ids = numpy.concatenate(
+            [
+                parser.parse(_TID_BINARY_COPY[:i]),
+                parser.parse(_TID_BINARY_COPY[i:]),
+            ]
+        )
+        parser.finish()
+        assert ids.tolist() == [1, (256 << 16) | 2]
+
+
+def test_binary_body():
+    for i in range(len(_TID_BINARY_COPY)):
+        parser = slice_db.pg.copy.BinaryCopyBodyParser()
+        body = parser.parse(_TID_BINARY_COPY[:i]) + parser.parse(_TID_BINARY_COPY[i:])
+        parser.finish()
+        assert body == _TID_BINARY_COPY[19:-2]
@@ -0,0 +1,179 @@
+import json
+import zipfile
+
+from file import temp_file
+from pg import connection, transaction
+from process import run_process
+
+_SCHEMA_SQL = """
+    CREATE TABLE parent (
+        id int PRIMARY KEY
+    );
+
+    CREATE TABLE child (
+        id int PRIMARY KEY,
+        parent_id int REFERENCES parent (id),
+        label text
+    );
+
+    CREATE TABLE note (
+        id int PRIMARY KEY,
+        parent_id int REFERENCES parent (id),
+        text text NOT NULL
+    );
+"""
+
+_SCHEMA_JSON = {
+    "references": {
+        "public.child.child_parent_id_fkey": {
+            "columns": ["parent_id"],
+            "referenceColumns": ["id"],
+            "referenceTable": "public.parent",
+            "table": "public.child",
+        },
+        "public.note.note_parent_id_fkey": {
+            "columns": ["parent_id"],
+            "referenceColumns": ["id"],
+            "referenceTable": "public.parent",
+            "table": "public.note",
+        },
+    },
+    "sequences": {},
+    "tables": {
+        "public.parent": {
+            "columns": ["id"],
+            "name": "parent",
+            "schema": "public",
+            "sequences": [],
+        },
+        "public.child": {
+            "columns": ["id", "parent_id", "label"],
+            "name": "child",
+            "schema": "public",
+            "sequences": [],
+        },
+        "public.note": {
+            "columns": ["id", "parent_id", "text"],
+            "name": "note",
+            "schema": "public",
+            "sequences": [],
+        },
+    },
+}
+
+_TRANSFORM_JSON = {
+    "tables": {"public.note": {"columns": {"text": "incrementingConst"}}},
+    "transforms": {
+        "incrementingConst": {
+            "class": "IncrementingConstTransform",
+            "config": {"value": "DEMO"},
+        }
+    },
+}
+
+# more than one segment
+_CHILD_COUNT = 60000
+
+
+def test_dump_binary(pg_database):
+    with temp_file("schema-") as schema_file, temp_file(
+        "transform-"
+    ) as transform_file, temp_file("output-") as output_file:
+        with connection("") as conn, transaction(conn) as cur:
+            cur.execute(_SCHEMA_SQL)
+
+            cur.execute(
+                """
+                    INSERT INTO parent (id)
+                    VALUES (1), (2);
+
+                    INSERT INTO child (id, parent_id, label)
+                    SELECT i, 1, CASE WHEN i %% 2 = 0 THEN 'a\tb' END
+                    FROM generate_series(1, %s) AS i;
+
+                    INSERT INTO child (id, parent_id, label)
+                    VALUES (%s, 2, 'c');
+
+                    INSERT INTO note (id, parent_id, text)
+                    VALUES (1, 1, 'foo'), (2, 1, 'bar'), (3, 2, 'baz');
+                """,
+                (_CHILD_COUNT, _CHILD_COUNT + 1),
+            )
+
+        with open(schema_file, "w") as f:
+            json.dump(_SCHEMA_JSON, f)
+
+        with open(transform_file, "w") as f:
+            json.dump(_TRANSFORM_JSON, f)
+
+        run_process(
+            [
+                "slicedb",
+                "dump",
+                "--binary",
+                "--schema",
+                schema_file,
+                "--transform",
+                transform_file,
+                "--pepper",
+                "abc",
+                "--root",
+                "public.parent",
+                "id = 1",
+                "--output",
+                output_file,
+            ]
+        )
+
+        with zipfile.ZipFile(output_file) as zip_file:
+            with zip_file.open("manifest.json") as f:
+                manifest = json.load(f)
+        assert manifest["tables"]["public.parent"]["format"] == "binary"
+        assert manifest["tables"]["public.child"]["format"] == "binary"
+        assert 1 < len(manifest["tables"]["public.child"]["segments"])
+        assert manifest["tables"]["public.note"]["format"] == "text"
+
+        with connection("") as conn, transaction(conn) as cur:
+            cur.execute(
+                """
+                    DELETE FROM note;
+
+                    DELETE FROM child;
+
+                    DELETE FROM parent;
+                """
+            )
+
+        run_process(
+            [
+                "slicedb",
+                "restore",
+                "--input",
+                output_file,
+            ]
+        )
+
+        with connection("") as conn, transaction(conn) as cur:
+            cur.execute("TABLE parent")
+            result = cur.fetchall()
+            assert result == [(1,)]
+
+            cur.execute(
+                """
+                    SELECT
+                        count(*),
+                        min(id),
+                        max(id),
+                        count(*) FILTER (WHERE label = 'a\tb'),
+                        count(*) FILTER (WHERE label IS NULL)
+                    FROM child
+                """
+            )
+            result = cur.fetchall()
+            assert result == [
+                (_CHILD_COUNT, 1, _CHILD_COUNT, _CHILD_COUNT // 2, _CHILD_COUNT // 2)
+            ]
+
+            cur.execute("SELECT * FROM note ORDER BY id")
+            result = cur.fetchall()
+            assert result == [(1, 1, "DEMO 1"), (2, 1, "DEMO 2")]
@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import json
+import types
+
+from slice_db.dump import Table, _DiscoveryResult
+from slice_db.dump_temp_table import MAX_SIZE, _RootTask, _split_blocks
+from slice_db.pg.copy import BINARY_HEADER, BINARY_TRAILER
+
+
+def test_split_blocks():
+    assert _split_blocks(10, 4) == [(0, 3), (3, 6), (6, 9), (9, None)]
+    assert _split_blocks(8, 4) == [(0, 2), (2, 4), (4, 6), (6, None)]
+
+
+def test_split_blocks_few():
+    assert _split_blocks(2, 4) == [(0, 1), (1, None)]
+    assert _split_blocks(1, 4) == [(0, None)]
+
+
+def test_split_blocks_empty():
+    assert _split_blocks(0, 4) == [(0, None)]
+
+
+class _Conn:
+    def __init__(self, server_version, plan_rows, block_count):
+        self.server_version = server_version
+        self.plan_rows = plan_rows
+        self.block_count = block_count
+        self.queries = []
+
+    def get_server_version(self):
+        return self.server_version
+
+    async def fetchval(self, query, *args):
+        self.queries.append(query)
+        if query.startswith("EXPLAIN"):
+            return json.dumps([{"Plan": {"Plan Rows": self.plan_rows}}])
+        return self.block_count
+
+    async def copy_from_query(self, query, output, format):
+        self.queries.append(query)
+        await output(BINARY_HEADER + BINARY_TRAILER)
+
+
+def _run_root(conn: _Conn, condition: str):
+    table = Table(
+        id="public.example",
+        name="example",
+        schema="public",
+        columns=["id"],
+        references=[],
+        reverse_references=[],
+        row_count=MAX_SIZE * 10,
+        sequences=[],
+    )
+
+    @contextlib.asynccontextmanager
+    async def conn_factory():
+        yield conn
+
+    tasks = []
+    dump = types.SimpleNamespace(
+        conn_factory=conn_factory,
+        parallelism=4,
+        result=_DiscoveryResult(binary_table_ids=set(), shard_count=1),
+        start_task=tasks.append,
+    )
+
+    async def run():
+        await _RootTask(table=table, condition=condition, dump=dump)()
+        while tasks:
+            await tasks.pop(0)
+
+    asyncio.run(run())
+
+
+def _discovery_queries(conn: _Conn):
+    return [
+        " ".join(query.split())
+        for query in conn.queries
+        if not query.startswith("EXPLAIN") and "ctid" in query
+    ]
+
+
+def test_root_split():
+    conn = _Conn(server_version=(14, 0), plan_rows=MAX_SIZE * 10, block_count=10)
+    _run_root(conn, "a = 1")
+    assert _discovery_queries(conn) == [
+        "SELECT ctid FROM public.example WHERE (a = 1)"
+        + " AND '(0,0)'::tid <= ctid AND ctid < '(3,0)'::tid ORDER BY 1",
+        "SELECT ctid FROM public.example WHERE (a = 1)"
+        + " AND '(3,0)'::tid <= ctid AND ctid < '(6,0)'::tid ORDER BY 1",
+        "SELECT ctid FROM public.example WHERE (a = 1)"
+        + " AND '(6,0)'::tid <= ctid AND ctid < '(9,0)'::tid ORDER BY 1",
+        "SELECT ctid FROM public.example WHERE (a = 1)"
+        + " AND '(9,0)'::tid <= ctid ORDER BY 1",
+    ]
+
+
+def test_root_split_selective():
+    conn = _Conn(server_version=(14, 0), plan_rows=1, block_count=10)
+    _run_root(conn, "a = 1")
+    assert _discovery_queries(conn) == [
+        "SELECT ctid FROM public.example WHERE a = 1 ORDER BY 1"
+    ]
+    assert not any("pg_relation_size" in query for query in conn.queries)
+
+
+def test_root_split_old_server():
+    conn = _Conn(server_version=(13, 0), plan_rows=MAX_SIZE * 10, block_count=10)
+    _run_root(conn, "a = 1")
+    assert _discovery_queries(conn) == [
+        "SELECT ctid FROM public.example WHERE a = 1 ORDER BY 1"
+    ]
+    assert not any(query.startswith("EXPLAIN") for query in conn.queries)
@@ -0,0 +1,29 @@
+import asyncio
+
+from slice_db.concurrent.graph import GraphRunner
+
+
+def test_graph_runner():
+    order = []
+    dep_calls = []
+
+    def item(name):
+        async def fn():
+            order.append(name)
+
+        fn.__name__ = name
+        return fn
+
+    a = item("a")
+    b = item("b")
+    c = item("c")
+    deps = {a: [], b: [a], c: [a, b]}
+
+    def dep_fn(item):
+        dep_calls.append(item)
+        return deps[item]
+
+    asyncio.run(GraphRunner(dep_fn).run(iter([c, b, a])))
+
+    assert order == ["a", "b", "c"]
+    assert len(dep_calls) == 3
@@ -4,7 +4,7 @@ import os
 import numpy
 import psutil
 
-from slice_db.collection.set import IntSet
+from slice_db.collection.set import IntSet, ShardedIntSet
 
 
 def test_set_memory():
@@ -38,3 +38,37 @@ def test_set_old():
     set = IntSet(numpy.int32)
     set.add([8, 9, 3])
     assert set.add([9, 8]) == []
+
+
+def test_set_duplicate():
+    set = IntSet(numpy.int32)
+    assert set.add([8, 3, 8]) == [8, 3]
+    assert len(set) == 2
+
+
+def test_set_contains():
+    set = IntSet(numpy.int32)
+    set.add([8, 9, 3])
+    assert set.contains_array(numpy.array([3, 4, 9])).tolist() == [True, False, True]
+
+
+def test_set_merge():
+    set = IntSet(numpy.int32)
+    set.add([20, 5])
+    assert set.add([30, 10, 1, 5]) == [30, 10, 1]
+    assert set.contains_array(numpy.array([0, 1, 5, 10, 20, 30, 31])).tolist() == [
+        False,
+        True,
+        True,
+        True,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_sharded_set():
+    set = ShardedIntSet(numpy.int64, 4)
+    assert set.add([8, 9, 3]).tolist() == [3, 8, 9]
+    assert set.add([9, 2, 8]).tolist() == [2]
+    assert len(set) == 4